@@ -0,0 +1,76 @@
+import functools
+import gzip
+import hashlib
+import os
+import pickle
+import time
+
+from _files import atomic_write_bytes
+
+# Local cache for API payloads, so back-to-back runs don't re-download data
+# that DefiLlama has barely had a chance to change.
+CACHE_DIR = "data/cache"
+DEFAULT_TTL = 60  # seconds
+
+
+def get_cache_ttl():
+    """Returns the cache TTL in seconds (DEFILLAMA_CACHE_TTL, 0 disables the cache)."""
+    return float(os.getenv("DEFILLAMA_CACHE_TTL", DEFAULT_TTL))
+
+
+def cache_path(url):
+    """Maps a URL to its cache file path."""
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"pools-{digest}.pkl.gz")
+
+
+def load_cached(url, ttl):
+    """Returns the cached payload for `url` if it is younger than `ttl`, else None."""
+    path = cache_path(url)
+    try:
+        if time.time() - os.path.getmtime(path) >= ttl:
+            return None
+        with gzip.open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def store_cached(url, data):
+    """Atomically writes `data` to the cache file for `url`."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    payload = gzip.compress(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), compresslevel=1)
+    atomic_write_bytes(cache_path(url), payload)
+
+
+def read_cache(url):
+    """Returns the fresh cached payload for `url` (announcing the hit), or None on a miss/disabled cache."""
+    ttl = get_cache_ttl()
+    if ttl <= 0:
+        return None
+    cached = load_cached(url, ttl)
+    if cached is not None:
+        print(f"Using cached DefiLlama data ({cache_path(url)})")
+    return cached
+
+
+def write_cache(url, data):
+    """Stores a (non-empty) payload for `url`, unless the cache is disabled."""
+    if data and get_cache_ttl() > 0:
+        store_cached(url, data)
+
+
+def ttl_file_cache(url):
+    """Caches a fetcher's (non-empty) result on disk, keyed by `url`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cached = read_cache(url)
+            if cached is not None:
+                return cached
+
+            data = func(*args, **kwargs)
+            write_cache(url, data)
+            return data
+        return wrapper
+    return decorator
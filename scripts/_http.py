@@ -0,0 +1,28 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+# Retry transient failures (rate limits, gateway errors, dropped connections)
+# with exponential backoff + jitter so a single blip doesn't cost a log entry.
+RETRY_POLICY = Retry(
+    total=5,
+    backoff_factor=1.5,
+    backoff_jitter=1.0,
+    backoff_max=30,
+    status_forcelist=[429, 500, 502, 503, 504, 529],
+    # POST covers the alert webhooks: a rare duplicate alert beats a lost one
+    allowed_methods=["GET", "POST"],
+    respect_retry_after_header=True,
+)
+
+# Shared HTTP session so repeated calls reuse pooled keep-alive connections
+# instead of paying a fresh DNS + TCP + TLS handshake every time.
+SESSION = requests.Session()
+
+ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=RETRY_POLICY)
+SESSION.mount("https://", ADAPTER)
+
+# Accept-Encoding is left at the requests default, which advertises exactly what
+# urllib3 can decode here: gzip/deflate always, br when brotli (or brotlicffi) is
+# installed, zstd only with compression.zstd (Python 3.14+) or backports.zstd.
+SESSION.headers.update({"User-Agent": "apy-monitor"})
@@ -0,0 +1,45 @@
+import os
+
+import requests
+
+from _http import SESSION
+
+# Platform message limits, leaving some headroom
+DISCORD_MAX_CHARS = 1900
+TELEGRAM_MAX_CHARS = 4000
+
+
+def send_alerts(alerts):
+    """Sends all alerts of a run as one batched message per configured webhook.
+
+    Discord (DISCORD_WEBHOOK) and Telegram (TELEGRAM_BOT_TOKEN + TELEGRAM_CHAT_ID)
+    are both optional; each gets a single POST over the shared keep-alive session.
+    """
+    if not alerts:
+        return
+
+    message = "\n".join(alerts)
+
+    discord_webhook = os.getenv("DISCORD_WEBHOOK")
+    if discord_webhook:
+        _post("Discord", discord_webhook, {'content': message[:DISCORD_MAX_CHARS]})
+
+    telegram_token = os.getenv("TELEGRAM_BOT_TOKEN")
+    telegram_chat_id = os.getenv("TELEGRAM_CHAT_ID")
+    if telegram_token and telegram_chat_id:
+        _post(
+            "Telegram",
+            f"https://api.telegram.org/bot{telegram_token}/sendMessage",
+            {'chat_id': telegram_chat_id, 'text': message[:TELEGRAM_MAX_CHARS]},
+        )
+
+
+def _post(service, url, payload):
+    """POSTs a JSON payload, reporting (not raising) failures so alerts never abort a run."""
+    try:
+        response = SESSION.post(url, json=payload, timeout=10)
+        response.raise_for_status()
+        print(f"Sent alert notification to {service}")
+    except requests.exceptions.RequestException as e:
+        # Don't echo the exception: the URL contains the webhook secret / bot token
+        print(f"Error sending {service} notification ({type(e).__name__})")
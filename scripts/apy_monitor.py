@@ -1,12 +1,30 @@
+import csv
+import functools
 import os
 import requests
-import json
-import pandas as pd
+import urllib3
+import orjson
+from dataclasses import dataclass, field
 from datetime import datetime
-from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; CSV appends are then unlocked
+    fcntl = None
+
+try:
+    import ahocorasick
+except ImportError:  # Optional C extension (pyahocorasick); fall back to token matching
+    ahocorasick = None
+
+from _cache import ttl_file_cache
+from _http import SESSION
+from _notify import send_alerts
+from _files import atomic_write_bytes
 
 # --- Configuration ---
-load_dotenv() 
+# Environment-driven settings are read through the cached get_* helpers below, so
+# they pick up values from .env, which main() loads (not at import time).
 
 # Base URL for the DefiLlama API endpoint for APY data
 DEFILLAMA_API_URL = "https://yields.llama.fi/pools" 
@@ -21,16 +39,167 @@ TARGET_ASSETS = [
     # ETH LSTs
     "wstETH", "rETH"
 ]
-
-# Monitoring thresholds
-APY_THRESHOLD = float(os.getenv("APY_THRESHOLD", "4.0")) # Now set to 4.0% via GitHub Secret
+AAVE_MARK = "aave"
 
 # File path configuration
 PROJECT_SLUG = "aave-all" 
 LOGS_DIR = "data/logs"
 EXPORTS_DIR = "data/exports"
-LOG_FILE = os.path.join(LOGS_DIR, f"apy_log_{PROJECT_SLUG}.csv")
-EXPORT_FILE = os.path.join(EXPORTS_DIR, f"apy_snapshot_{PROJECT_SLUG}.json")
+LOG_FIELDS = ['timestamp', 'pool_id', 'chain', 'asset_symbol', 'apy', 'project', 'tvlUsd']
+
+
+@functools.lru_cache(maxsize=None)
+def get_target_pool_ids():
+    """Optional explicit DefiLlama pool UUIDs (TARGET_POOL_IDS, comma-separated).
+
+    When set, exactly these pools are monitored and the project/asset filter is skipped.
+    """
+    raw = os.getenv("TARGET_POOL_IDS", "")
+    return frozenset(pool_id.strip() for pool_id in raw.split(",") if pool_id.strip())
+
+
+@functools.lru_cache(maxsize=None)
+def get_apy_threshold():
+    """Monitoring threshold in percent (APY_THRESHOLD, set to 4.0% via GitHub Secret)."""
+    return float(os.getenv("APY_THRESHOLD", "4.0"))
+
+
+@functools.lru_cache(maxsize=None)
+def get_log_format():
+    """Log storage format: "csv" (default, appends to Config.log_file) or "parquet" (Config.parquet_log_dir)."""
+    return os.getenv("LOG_FORMAT", "csv").lower()
+
+
+@functools.lru_cache(maxsize=None)
+def get_asset_matcher(assets):
+    """Returns a predicate telling whether an uppercased pool symbol contains any of `assets`.
+
+    Uses an Aho-Corasick automaton (one scan of the symbol for all assets) when
+    pyahocorasick is installed, otherwise matches '-'/'.'-separated symbol tokens
+    against a set.
+    """
+    patterns = frozenset(asset.upper() for asset in assets)
+    if not patterns:
+        # An automaton with no words can't be iterated; nothing can match anyway
+        return lambda symbol: False
+
+    if ahocorasick is None:
+        return lambda symbol: not patterns.isdisjoint(symbol.replace('.', '-').split('-'))
+
+    automaton = ahocorasick.Automaton()
+    for pattern in patterns:
+        automaton.add_word(pattern, pattern)
+    automaton.make_automaton()
+    return lambda symbol: any(automaton.iter(symbol))
+
+
+@functools.lru_cache(maxsize=None)
+def is_streaming():
+    """DEFILLAMA_STREAM=1 parses /pools incrementally (ijson) instead of loading it whole."""
+    return os.getenv("DEFILLAMA_STREAM", "").lower() in ("1", "true", "yes")
+
+
+@functools.lru_cache(maxsize=None)
+def is_quiet():
+    """QUIET=1 suppresses the per-pool "below threshold" lines (alerts are still printed)."""
+    return os.getenv("QUIET", "").lower() in ("1", "true", "yes")
+
+
+@functools.lru_cache(maxsize=None)
+def get_export_compression():
+    """Snapshot compression (EXPORT_COMPRESSION): "" for plain JSON (default) or "zstd"."""
+    return os.getenv("EXPORT_COMPRESSION", "").lower()
+
+
+@dataclass(frozen=True)
+class Config:
+    """One monitored basket of pools: what to select, where to log it, when to alert."""
+    target_assets: tuple = tuple(TARGET_ASSETS)  # Any iterable of symbols; stored as a tuple
+    target_pool_ids: frozenset = frozenset()  # Any iterable of pool IDs; when non-empty, overrides the project/asset filter
+    project_slug: str = PROJECT_SLUG
+    project_mark: str = AAVE_MARK
+    apy_threshold: float = 4.0
+
+    def __post_init__(self):
+        # Normalize to hashable containers: both feed lru_cache / filter_cache keys
+        object.__setattr__(self, 'target_assets', tuple(self.target_assets))
+        object.__setattr__(self, 'target_pool_ids', frozenset(self.target_pool_ids))
+
+    @property
+    def filter_key(self):
+        # Configs with equal keys select exactly the same pools
+        return (self.target_assets, self.target_pool_ids, self.project_mark)
+
+    @property
+    def log_file(self):
+        return os.path.join(LOGS_DIR, f"apy_log_{self.project_slug}.csv")
+
+    @property
+    def parquet_log_dir(self):
+        # Partitioned by date=YYYY-MM-DD
+        return os.path.join(LOGS_DIR, f"apy_log_{self.project_slug}")
+
+    @property
+    def export_file(self):
+        return os.path.join(EXPORTS_DIR, f"apy_snapshot_{self.project_slug}.json")
+
+
+@functools.lru_cache(maxsize=None)
+def get_parquet_schema():
+    """Arrow schema of the Parquet log (the date lives in the partition path)."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ('timestamp', pa.timestamp('us')),
+        ('pool_id', pa.string()),
+        ('chain', pa.dictionary(pa.int16(), pa.string())),
+        ('asset_symbol', pa.dictionary(pa.int16(), pa.string())),
+        ('apy', pa.float32()),
+        ('project', pa.dictionary(pa.int16(), pa.string())),
+        ('tvlUsd', pa.float64()),
+    ])
+
+
+@dataclass(slots=True)
+class LogColumns:
+    """Column-oriented buffer of log rows: one list per LOG_FIELDS column."""
+    timestamp: list = field(default_factory=list)
+    pool_id: list = field(default_factory=list)
+    chain: list = field(default_factory=list)
+    asset_symbol: list = field(default_factory=list)
+    apy: list = field(default_factory=list)
+    project: list = field(default_factory=list)
+    tvlUsd: list = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.pool_id)
+
+    def append(self, timestamp, pool_id, chain, asset_symbol, apy, project, tvlUsd):
+        self.timestamp.append(timestamp)
+        self.pool_id.append(pool_id)
+        self.chain.append(chain)
+        self.asset_symbol.append(asset_symbol)
+        self.apy.append(apy)
+        self.project.append(project)
+        self.tvlUsd.append(tvlUsd)
+
+    def rows(self):
+        """Iterates over the buffered rows in LOG_FIELDS order, for the CSV log."""
+        timestamps = [timestamp.isoformat() for timestamp in self.timestamp]
+        return zip(timestamps, self.pool_id, self.chain, self.asset_symbol, self.apy, self.project, self.tvlUsd)
+
+    def to_record_batch(self):
+        """Converts the buffer to an Arrow RecordBatch with the Parquet log schema."""
+        import pyarrow as pa
+
+        schema = get_parquet_schema()
+        arrays = [pa.array(getattr(self, name), type=schema.field(name).type) for name in LOG_FIELDS]
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def default_config():
+    """The Aave basket monitored by the scheduled workflow, with .env/secret overrides applied."""
+    return Config(target_pool_ids=get_target_pool_ids(), apy_threshold=get_apy_threshold())
 
 
 def setup_directories():
@@ -39,104 +208,246 @@ def setup_directories():
     os.makedirs(EXPORTS_DIR, exist_ok=True)
 
 
+@ttl_file_cache(DEFILLAMA_API_URL)
 def fetch_all_pool_data():
     """Fetches all yield pool data from DefiLlama."""
     print(f"Fetching data from DefiLlama: {DEFILLAMA_API_URL}")
     try:
-        response = requests.get(DEFILLAMA_API_URL, timeout=20) # Increased timeout
+        response = SESSION.get(DEFILLAMA_API_URL, timeout=20) # Increased timeout
         response.raise_for_status() 
-        return response.json().get('data', [])
+        # Parse the (already decompressed) bytes directly - skips building response.text
+        return orjson.loads(response.content).get('data', [])
     except requests.exceptions.RequestException as e:
         print(f"Error fetching DefiLlama data: {e}")
         return []
+    except orjson.JSONDecodeError as e:
+        print(f"Error decoding DefiLlama response: {e}")
+        return []
+
+
+def make_pool_filter(config):
+    """Returns a predicate telling whether a raw DefiLlama pool is monitored by `config`."""
+    if config.target_pool_ids:
+        target_pool_ids = config.target_pool_ids
+        return lambda pool: pool.get('pool') in target_pool_ids
+
+    matches_target_asset = get_asset_matcher(config.target_assets)
+    project_mark = config.project_mark
+
+    def selects(pool):
+        # 1. Filter by Asset Symbol (USDC, CBTC, etc.) - the cheaper check rejects most pools
+        if not matches_target_asset((pool.get('symbol') or '').upper()):
+            return False
+        # 2. Filter by Project (e.g. Aave and Aave V3)
+        return project_mark in (pool.get('project') or '').lower()
+
+    return selects
+
 
+def find_target_pools_data(all_pools, config, filter_cache=None):
+    """Searches for all pools belonging to the config's project and filters by asset.
 
-def find_target_pools_data(all_pools):
-    """Searches for all pools belonging to 'Aave' and filters by asset."""
-    target_data = {}
-    print(f"Searching for pools belonging to project: Aave")
-
-    for pool in all_pools:
-        # 1. Filter by Project (Aave and Aave V3)
-        project = pool.get('project', '').lower()
-        if 'aave' not in project:
-            continue
-            
-        # 2. Filter by Asset Symbol (USDC, CBTC, etc.)
-        symbol = pool.get('symbol', '').upper()
-        
-        # Check if the pool's symbol is in our target asset list
-        if any(asset in symbol for asset in TARGET_ASSETS):
-            pool_id = pool.get('pool')
-            target_data[pool_id] = pool
-    
-    print(f"Found {len(target_data)} relevant Aave pools to monitor.")
+    `filter_cache` (a dict scoped to one `all_pools` list) memoizes results by
+    Config.filter_key, so configs sharing a filter scan the pool list only once.
+    """
+    if filter_cache is not None and config.filter_key in filter_cache:
+        return filter_cache[config.filter_key]
+
+    if config.target_pool_ids:
+        target_data = find_pools_by_id(all_pools, config.target_pool_ids)
+    else:
+        print(f"Searching for pools belonging to project: {config.project_mark}")
+        selects = make_pool_filter(config)
+        target_data = {pool.get('pool'): pool for pool in all_pools if selects(pool)}
+        print(f"Found {len(target_data)} relevant {config.project_mark} pools to monitor.")
+
+    if filter_cache is not None:
+        filter_cache[config.filter_key] = target_data
+    return target_data
+
+
+def stream_target_pools(configs):
+    """Streams the /pools response through ijson, keeping only pools some config monitors.
+
+    Fuses fetch, parse and filter into one pass, so peak memory is bounded by the
+    kept pools rather than the full payload. Bypasses the disk cache.
+    Returns None if the fetch or decode fails; an empty list just means nothing matched.
+    """
+    import ijson
+
+    filters = [make_pool_filter(config) for config in configs]
+    print(f"Streaming data from DefiLlama: {DEFILLAMA_API_URL}")
+    try:
+        with SESSION.get(DEFILLAMA_API_URL, stream=True, timeout=20) as response:
+            response.raise_for_status()
+            # Let urllib3 undo the Content-Encoding (gzip/br) while ijson reads
+            response.raw.decode_content = True
+            pools = ijson.items(response.raw, 'data.item', use_float=True)
+            return [pool for pool in pools if any(selects(pool) for selects in filters)]
+    # Reading response.raw bypasses requests' error wrapping, so mid-stream failures
+    # (truncated body, read timeout, bad encoding) surface as urllib3 errors
+    except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError) as e:
+        print(f"Error fetching DefiLlama data: {e}")
+        return None
+    except ijson.JSONError as e:
+        print(f"Error decoding DefiLlama response: {e}")
+        return None
+
+
+def find_pools_by_id(all_pools, target_pool_ids):
+    """Picks out the pools listed in `target_pool_ids` in a single pass."""
+    print(f"Searching for {len(target_pool_ids)} pools by ID")
+    target_data = {pool['pool']: pool for pool in all_pools if pool.get('pool') in target_pool_ids}
+
+    missing = target_pool_ids - target_data.keys()
+    if missing:
+        print(f"Warning: {len(missing)} target pool IDs not found on DefiLlama: {', '.join(sorted(missing))}")
+
+    print(f"Found {len(target_data)} of {len(target_pool_ids)} target pools.")
     return target_data
 
 
-def log_and_check_pools(pools_data):
-    """Processes each pool: logs data, exports latest, and checks threshold."""
-    all_new_entries = []
-    current_time = datetime.now().isoformat()
-    
+def log_and_check_pools(pools_data, config):
+    """Processes each pool: logs data and checks threshold. Returns the alert messages."""
+    all_new_entries = LogColumns()
+    alerts = []
+    now = datetime.now()
+
+    # Hoisted out of the loop: plain locals are cheaper than repeated global/attribute lookups
+    append = all_new_entries.append
+    apy_threshold = config.apy_threshold
+    threshold_str = f"{apy_threshold:.2f}"
+    quiet = is_quiet()
+
     for pool_id, pool_data in pools_data.items():
-        apy_value = pool_data.get('apy', 0.0)
-        
-        # Determine a friendly name for logging
-        pool_name = f"{pool_data.get('symbol')} ({pool_data.get('chain')} {pool_data.get('project', 'Aave')})"
-        
-        # 1. Create Log Entry
-        new_entry = {
-            'timestamp': current_time,
-            'pool_id': pool_id, # This is the DefiLlama UUID
-            'chain': pool_data.get('chain'),
-            'asset_symbol': pool_data.get('symbol'),
-            'apy': apy_value,
-            'project': pool_data.get('project'),
-            'tvlUsd': pool_data.get('tvlUsd', 0.0)
-        }
-        all_new_entries.append(new_entry)
-        
+        get = pool_data.get
+        apy_value = get('apy') or 0.0
+        symbol = get('symbol')
+        chain = get('chain')
+        project = get('project')
+
+        # 1. Create Log Entry (pool_id is the DefiLlama UUID)
+        append(now, pool_id, chain, symbol, apy_value, project, get('tvlUsd', 0.0))
+
         # 2. Check Threshold
-        if apy_value >= APY_THRESHOLD:
-            print(f"\n✨ ALERT: High Yield Detected! Pool: {pool_name} | APY: {apy_value:.2f}% >= Threshold: {APY_THRESHOLD:.2f}% ✨")
-            # Future Step: Integrate your Discord/Telegram webhook here!
-        else:
+        if apy_value >= apy_threshold:
+            pool_name = f"{symbol} ({chain} {project or 'Aave'})"
+            print(f"\n✨ ALERT: High Yield Detected! Pool: {pool_name} | APY: {apy_value:.2f}% >= Threshold: {threshold_str}% ✨")
+            alerts.append(f"✨ {pool_name} | APY: {apy_value:.2f}% >= {threshold_str}%")
+        elif not quiet:
+            pool_name = f"{symbol} ({chain} {project or 'Aave'})"
             print(f"Pool: {pool_name} | APY: {apy_value:.2f}% (Below threshold)")
 
-    # 3. Batch Log to CSV
+    # 3. Batch Log to CSV / Parquet
     if all_new_entries:
-        new_df = pd.DataFrame(all_new_entries)
-        file_exists = os.path.exists(LOG_FILE)
-        new_df.to_csv(LOG_FILE, mode='a', header=not file_exists, index=False)
-        print(f"\nSuccessfully logged {len(all_new_entries)} pool entries to {LOG_FILE}")
+        if get_log_format() == "parquet":
+            write_parquet_log(all_new_entries, now, config.parquet_log_dir)
+        else:
+            write_csv_log(all_new_entries, config.log_file)
+
+    return alerts
+
+
+def write_csv_log(entries, log_file):
+    """Appends log entries to the CSV log, writing the header for a new file."""
+    with open(log_file, 'a', newline='') as f:
+        if fcntl is not None:
+            # Serialize overlapping runs; the lock is released when the file is closed
+            fcntl.flock(f, fcntl.LOCK_EX)
+
+        # Decide on the header only while holding the lock, so two runs can't both write it
+        f.seek(0, os.SEEK_END)
+        writer = csv.writer(f, lineterminator='\n')
+        if f.tell() == 0:
+            writer.writerow(LOG_FIELDS)
+        writer.writerows(entries.rows())
+    print(f"\nSuccessfully logged {len(entries)} pool entries to {log_file}")
 
 
-def export_latest_data(pools_data):
+def write_parquet_log(entries, now, log_dir):
+    """Appends log entries as a new zstd Parquet file in today's date partition."""
+    import pyarrow.parquet as pq
+
+    date = now.date().isoformat()
+    partition_dir = os.path.join(log_dir, f"date={date}")
+    os.makedirs(partition_dir, exist_ok=True)
+
+    # One file per run, so appending never rewrites existing data
+    path = os.path.join(partition_dir, f"part-{now:%Y%m%dT%H%M%S%f}.parquet")
+    batch = entries.to_record_batch()
+    with pq.ParquetWriter(path, batch.schema, compression='zstd') as writer:
+        writer.write_batch(batch)
+    print(f"\nSuccessfully logged {len(entries)} pool entries to {partition_dir}")
+
+
+def export_latest_data(pools_data, export_file):
     """Exports the full latest pool data to a single JSON file."""
     if pools_data:
-        with open(EXPORT_FILE, 'w') as f:
-            json.dump(pools_data, f, indent=4)
-        print(f"Exported latest data for {len(pools_data)} pools to {EXPORT_FILE}")
+        payload = orjson.dumps(pools_data, option=orjson.OPT_INDENT_2)
+        if get_export_compression() == "zstd":
+            import zstandard
+            payload = zstandard.ZstdCompressor(level=3).compress(payload)
+            export_file += ".zst"
 
+        atomic_write_bytes(export_file, payload)
+        print(f"Exported latest data for {len(pools_data)} pools to {export_file}")
 
-def main():
-    """Main execution function for the APY monitor."""
+
+def process_pools(all_pools, config, filter_cache=None):
+    """Filters the fetched pools, then logs, exports and checks the relevant ones. Returns the alerts."""
+    # Find the data for all relevant pools
+    target_pools_data = find_target_pools_data(all_pools, config, filter_cache)
+
+    if not target_pools_data:
+        print(f"Could not find any relevant pools for {config.project_slug}. Check the target assets / pool IDs.")
+        return []
+
+    alerts = log_and_check_pools(target_pools_data, config)
+    export_latest_data(target_pools_data, config.export_file)
+    return alerts
+
+
+def process_all(all_pools, configs):
+    """Processes every config against one fetched pool list. Returns all of their alerts.
+
+    Filter results are memoized per Config.filter_key for this pool list only.
+    """
+    alerts = []
+    filter_cache = {}
+    for config in configs:
+        alerts.extend(process_pools(all_pools, config, filter_cache))
+    return alerts
+
+
+def run(config):
+    """Runs the monitor for a single config."""
+    run_all([config])
+
+
+def run_all(configs):
+    """Runs the monitor for several configs against a single fetch of the pool list."""
     setup_directories()
-    
-    all_pools = fetch_all_pool_data()
-    if not all_pools:
+
+    if is_streaming():
+        all_pools = stream_target_pools(configs)
+        fetch_failed = all_pools is None  # [] is a valid "nothing matched" result here
+    else:
+        all_pools = fetch_all_pool_data()
+        fetch_failed = not all_pools
+    if fetch_failed:
         print("Failed to get pool data. Exiting.")
         return
 
-    # Find the data for all relevant Aave pools
-    target_pools_data = find_target_pools_data(all_pools)
+    # One batched notification for the whole run
+    send_alerts(process_all(all_pools, configs))
 
-    if target_pools_data:
-        log_and_check_pools(target_pools_data)
-        export_latest_data(target_pools_data)
-    else:
-        print("Could not find any relevant Aave pools. Check the TARGET_ASSETS list.")
+
+def main():
+    """Main execution function for the APY monitor."""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    run(default_config())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,95 @@
+import asyncio
+import random
+
+import aiohttp
+import orjson
+from urllib3.exceptions import InvalidHeader
+
+from _cache import read_cache, write_cache
+from _http import RETRY_POLICY
+from _notify import send_alerts
+from apy_monitor import DEFILLAMA_API_URL, default_config, is_streaming, process_all, setup_directories
+
+# Retry policy for the DefiLlama GET (mirrors the session retry in _http.py)
+MAX_ATTEMPTS = 5
+RETRY_STATUSES = {429, 500, 502, 503, 504, 529}
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=20)
+HEADERS = {"User-Agent": "apy-monitor"}
+
+
+def parse_retry_after(value):
+    """Parses a Retry-After header (seconds or HTTP date) into seconds, or None if absent/invalid."""
+    if not value:
+        return None
+    try:
+        return RETRY_POLICY.parse_retry_after(value)
+    except InvalidHeader:
+        return None
+
+
+async def fetch_all_pool_data(session):
+    """Fetches all yield pool data from DefiLlama, retrying transient failures."""
+    cached = read_cache(DEFILLAMA_API_URL)
+    if cached is not None:
+        return cached
+
+    print(f"Fetching data from DefiLlama: {DEFILLAMA_API_URL}")
+    for attempt in range(MAX_ATTEMPTS):
+        retry_after = None
+        try:
+            async with session.get(DEFILLAMA_API_URL) as response:
+                if response.status not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    data = orjson.loads(await response.read()).get('data', [])
+                    write_cache(DEFILLAMA_API_URL, data)
+                    return data
+                error = f"HTTP {response.status}"
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+            error = repr(e)
+        except (aiohttp.ClientError, orjson.JSONDecodeError) as e:
+            print(f"Error fetching DefiLlama data: {e}")
+            return []
+
+        if attempt + 1 < MAX_ATTEMPTS:
+            # Like the sync session's Retry policy, a server-provided Retry-After wins over backoff
+            delay = retry_after if retry_after is not None else random.uniform(2, 4) * (attempt + 1)
+            print(f"DefiLlama request failed ({error}), retrying in {delay:.1f}s...")
+            # Never time.sleep() here - it would block the event loop
+            await asyncio.sleep(delay)
+
+    print(f"Error fetching DefiLlama data: giving up after {MAX_ATTEMPTS} attempts ({error})")
+    return []
+
+
+async def run_all(configs):
+    """Runs the monitor for several configs against a single async fetch of /pools."""
+    setup_directories()
+
+    if is_streaming():
+        print("DEFILLAMA_STREAM is only supported by scripts/apy_monitor.py; fetching the full payload.")
+
+    connector = aiohttp.TCPConnector(limit=10, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector, headers=HEADERS, timeout=REQUEST_TIMEOUT) as session:
+        all_pools = await fetch_all_pool_data(session)
+
+    if not all_pools:
+        print("Failed to get pool data. Exiting.")
+        return
+
+    alerts = process_all(all_pools, configs)
+
+    # One batched notification, sent off the event loop thread
+    await asyncio.to_thread(send_alerts, alerts)
+
+
+async def main():
+    """Async entry point: one shared connection pool, one fetch of /pools."""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    await run_all([default_config()])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())